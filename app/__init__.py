@@ -1,2 +1,9 @@
+import os
+
 from sqlalchemy.ext.declarative import declarative_base
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+# Number of worker processes, used to split connection limits across workers. Read from the real
+# environment rather than .env, because that's the only place uvicorn itself looks; unset means
+# uvicorn's default of one worker.
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
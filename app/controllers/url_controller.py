@@ -1,14 +1,30 @@
+import time
+
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
 from starlette.responses import RedirectResponse
 
-from app.database import get_db
+from app.database import AsyncSessionLocal
 from app.schemas.url_schemas import URLCreate, URLResponse, URLUpdate
 from app.services.analytics_service import AnalyticsService, get_analytics_service
 from app.services.url_service import get_url_service, URLService
 
 router = APIRouter(prefix="/urls", tags=["urls"])
 
+REDIRECT_MAX_AGE = 300  # seconds
+
+
+def redirect_response(original_url: str, expires_ts: int) -> RedirectResponse:
+    """307 redirect that browsers and CDNs may reuse for a few minutes, but never past expiry"""
+    max_age = REDIRECT_MAX_AGE
+    if expires_ts:
+        max_age = max(0, min(max_age, expires_ts - int(time.time())))
+    return RedirectResponse(
+        url=original_url,
+        status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        headers={"Cache-Control": f"public, max-age={max_age}"}
+    )
+
 
 @router.post("/", response_model=URLResponse, status_code=status.HTTP_201_CREATED)
 async def create_short_url(
@@ -20,14 +36,7 @@ async def create_short_url(
     client_ip = request.client.host
     db_url = await url_service.create_short_url(url_data, client_ip)
 
-    return URLResponse(
-        short_url=f"/r/{db_url.short_code}",
-        original_url=db_url.original_url,
-        custom_alias=db_url.custom_alias,
-        created_at=db_url.created_at,
-        expires_at=db_url.expires_at,
-        clicks=db_url.clicks
-    )
+    return URLResponse.model_validate(db_url)
 
 
 @router.get("/{short_code}")
@@ -40,11 +49,10 @@ async def redirect_to_original(
     client_ip = request.client.host
     user_agent = request.headers.get("user-agent")
 
-    original_url = await url_service.get_original_url(short_code, client_ip, user_agent)
+    original_url, expires_ts = await url_service.get_original_url(short_code, client_ip, user_agent)
 
     # Return redirect response
-    from fastapi.responses import RedirectResponse
-    return RedirectResponse(url=original_url)
+    return redirect_response(original_url, expires_ts)
 
 
 @router.put("/{short_code}", response_model=URLResponse)
@@ -57,14 +65,7 @@ async def update_short_url(
     """Update short URL properties"""
     db_url = await url_service.update_url(short_code, update_data)
 
-    return URLResponse(
-        short_url=f"/r/{db_url.short_code}",
-        original_url=db_url.original_url,
-        custom_alias=db_url.custom_alias,
-        created_at=db_url.created_at,
-        expires_at=db_url.expires_at,
-        clicks=db_url.clicks
-    )
+    return URLResponse.model_validate(db_url)
 
 
 @router.delete("/{short_code}")
@@ -89,8 +90,20 @@ async def get_url_analytics(
 @router.get("/r/{short_code}")
 async def redirect_short_url(request: Request, short_code: str, url_service: URLService = Depends(get_url_service)):
     """Alternative redirect endpoint"""
-    from app.database import get_db
     client_ip = request.client.host
     user_agent = request.headers.get("user-agent")
-    original_url = await url_service.get_original_url(short_code, client_ip, user_agent)
-    return RedirectResponse(url=original_url)
+    original_url, expires_ts = await url_service.get_original_url(short_code, client_ip, user_agent)
+    return redirect_response(original_url, expires_ts)
+
+
+async def redirect_fast(request: Request) -> RedirectResponse:
+    """Redirect to original URL without going through FastAPI's dependency resolution"""
+    short_code = request.path_params["short_code"]
+    client_ip = request.client.host
+    user_agent = request.headers.get("user-agent")
+
+    # A session only checks out a connection when first used, so cache hits never touch the pool
+    async with AsyncSessionLocal() as session:
+        original_url, expires_ts = await URLService(session).get_original_url(short_code, client_ip, user_agent)
+
+    return redirect_response(original_url, expires_ts)
@@ -0,0 +1,53 @@
+"""Load MaxMind GeoLite2 country data into the country_ranges table.
+
+Usage:
+    python -m app.geoip GeoLite2-Country-Blocks-IPv4.csv GeoLite2-Country-Locations-en.csv
+"""
+import asyncio
+import csv
+import sys
+
+from sqlalchemy import delete, insert
+
+from app.database import AsyncSessionLocal, create_tables
+from app.models.url_models import CountryRange
+
+BATCH_SIZE = 5000
+
+
+def read_country_ranges(blocks_csv: str, locations_csv: str) -> list:
+    """Join the GeoLite2 blocks and locations CSVs into network/country_code rows"""
+    with open(locations_csv, newline="") as f:
+        countries = {row["geoname_id"]: row["country_iso_code"] for row in csv.DictReader(f)
+                     if row["country_iso_code"]}
+
+    with open(blocks_csv, newline="") as f:
+        ranges = []
+        for row in csv.DictReader(f):
+            country_code = countries.get(row["geoname_id"] or row["registered_country_geoname_id"])
+            if country_code:
+                ranges.append({"network": row["network"], "country_code": country_code})
+        return ranges
+
+
+async def load_country_ranges(blocks_csv: str, locations_csv: str):
+    """Replace the contents of country_ranges with the given GeoLite2 data"""
+    ranges = read_country_ranges(blocks_csv, locations_csv)
+
+    async with AsyncSessionLocal.begin() as session:
+        await session.execute(delete(CountryRange))
+        for start in range(0, len(ranges), BATCH_SIZE):
+            await session.execute(insert(CountryRange), ranges[start:start + BATCH_SIZE])
+
+    print(f"Loaded {len(ranges)} country ranges")
+
+
+async def main(blocks_csv: str, locations_csv: str):
+    await create_tables()
+    await load_country_ranges(blocks_csv, locations_csv)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    asyncio.run(main(sys.argv[1], sys.argv[2]))
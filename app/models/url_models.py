@@ -1,16 +1,35 @@
-import secrets
+import hashlib
 import string
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import Column, Integer, Text, String, DateTime, func, Boolean
+from decouple import config
+from sqlalchemy import Column, Integer, Text, String, DateTime, func, Boolean, Index, Sequence
+from sqlalchemy.dialects.postgresql import CIDR
 
 from app import Base
 
+SHORT_CODE_ALPHABET = string.ascii_letters + string.digits
+SHORT_CODE_LENGTH = 6  # 62**6 > 2**32, so every 32-bit id fits
+
+# Keys the Feistel rounds that scramble ids, so codes can't be enumerated without it.
+# Required, with no fallback: a shared default would make every deployment's codes predictable.
+SHORT_CODE_SECRET = config("SHORT_CODE_SECRET")
+if not SHORT_CODE_SECRET:
+    raise RuntimeError("SHORT_CODE_SECRET must be set to a random, private value")
+
+# Hashed to a fixed size because blake2b keys are limited to 64 bytes
+SHORT_CODE_KEY = hashlib.sha256(SHORT_CODE_SECRET.encode()).digest()
+SHORT_CODE_ROUNDS = 4
+
+# Same name as the sequence PostgreSQL creates for a SERIAL id, so existing databases keep working
+url_id_seq = Sequence("urls_id_seq")
+
 
 class URL(Base):
     __tablename__ = "urls"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # server_default gives new databases the same nextval() DEFAULT that SERIAL gave older ones
+    id = Column(Integer, url_id_seq, primary_key=True, index=True, server_default=url_id_seq.next_value())
     original_url = Column(Text, nullable=False)
     short_code = Column(String(50), unique=True, index=True, nullable=False)
     custom_alias = Column(String(50), unique=True, index=True, nullable=True)
@@ -19,23 +38,61 @@ class URL(Base):
     is_active = Column(Boolean, default=True)
     clicks = Column(Integer, default=0)
 
-    def generate_short_code(self, length: int = 6):
-        """Generate random short code"""
-        characters = string.ascii_letters + string.digits
-        return ''.join(secrets.choice(characters) for _ in range(length))
+    @property
+    def short_url(self) -> str:
+        return f"/r/{self.short_code}"
+
+    @staticmethod
+    def generate_short_code(url_id: int) -> str:
+        """Generate a fixed-width base62 short code from the scrambled id, unique per id by construction"""
+        # Keyed Feistel network over 32 bits: a bijection, so distinct ids never share a code,
+        # while neighbouring ids give unrelated codes
+        left, right = url_id >> 16, url_id & 0xFFFF
+        for round_index in range(SHORT_CODE_ROUNDS):
+            digest = hashlib.blake2b(bytes([round_index]) + right.to_bytes(2, 'big'),
+                                     digest_size=2, key=SHORT_CODE_KEY).digest()
+            left, right = right, left ^ int.from_bytes(digest, 'big')
+        number = (left << 16) | right
+
+        chars = []
+        for _ in range(SHORT_CODE_LENGTH):
+            number, remainder = divmod(number, len(SHORT_CODE_ALPHABET))
+            chars.append(SHORT_CODE_ALPHABET[remainder])
+        return ''.join(reversed(chars))
 
     def set_expiration(self, days: int):
         """Set expirations date"""
         if days:
-            self.expires_at = datetime.utcnow() + timedelta(days=days)
+            self.expires_at = datetime.now(timezone.utc) + timedelta(days=days)
 
 
 class Click(Base):
     __tablename__ = "clicks"
     id = Column(Integer, primary_key=True, index=True)
-    url_id = Column(Integer, index=True, nullable=False)
+    url_id = Column(Integer, nullable=False)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     ip_address = Column(String(45), nullable=False)
     user_agent = Column(Text, nullable=True)
     country = Column(String(2), nullable=True)
     referrer = Column(Text, nullable=True)
+    # Redis stream entry the click came from; unique so replaying a batch can't insert it twice
+    stream_id = Column(String(32), unique=True, index=True, nullable=True)
+
+    __table_args__ = (
+        # Serves the per-URL joins, aggregates and timelines in analytics; including country
+        # keeps the 24h, country and date queries index-only. Also covers plain url_id lookups.
+        Index("clicks_url_id_ts_country_idx", url_id, timestamp.desc(), postgresql_include=["country"]),
+    )
+
+
+class CountryRange(Base):
+    """IP network to country mapping, used by the clicks trigger to fill in Click.country"""
+    __tablename__ = "country_ranges"
+    network = Column(CIDR, primary_key=True)
+    country_code = Column(String(2), nullable=False)
+
+    __table_args__ = (
+        # GiST on inet_ops makes the `network >>= ip` containment lookup an index scan
+        Index("country_ranges_network_idx", network, postgresql_using="gist",
+              postgresql_ops={"network": "inet_ops"}),
+    )
@@ -1,13 +1,21 @@
 import redis.asyncio as redis
 from decouple import config
+from redis.exceptions import ResponseError
+
+from app import WEB_CONCURRENCY
 
 REDIS_URL = config("REDIS_URL", default="redis://localhost:6379")
+REDIS_MAX_CONNECTIONS = config("REDIS_MAX_CONNECTIONS", default=64, cast=int)  # Across all workers
+
+# Shared, bounded pool per worker (at least 2, since the click flusher keeps one blocked); callers wait for a free connection instead of failing when it's exhausted.
+# Replies are parsed by hiredis when it is installed.
+pool = redis.BlockingConnectionPool.from_url(REDIS_URL, max_connections=max(2, REDIS_MAX_CONNECTIONS // WEB_CONCURRENCY),
+                                             decode_responses=True)
 
 
 class RedisCache:
     def __init__(self):
-        # Create Redis client directly
-        self.redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+        self.redis_client = redis.Redis(connection_pool=pool)
 
     async def set_key(self, key: str, value: str, expire: int = None):
         """Set a key in Redis"""
@@ -41,9 +49,53 @@ class RedisCache:
         """Set a key's time to live in seconds"""
         await self.redis_client.expire(key, time)
 
+    async def xadd(self, key: str, fields: dict) -> str:
+        """Append an entry to a stream"""
+        return await self.redis_client.xadd(key, fields)
+
+    async def xgroup_create(self, key: str, group: str):
+        """Create a consumer group (and the stream) if it doesn't exist yet"""
+        try:
+            await self.redis_client.xgroup_create(key, group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def xreadgroup(self, group: str, consumer: str, key: str, last_id: str = ">",
+                         count: int = None, block: int = None) -> list:
+        """Read entries from a stream as part of a consumer group"""
+        response = await self.redis_client.xreadgroup(group, consumer, {key: last_id}, count=count, block=block)
+        return response[0][1] if response else []
+
+    async def xautoclaim(self, key: str, group: str, consumer: str, min_idle_ms: int,
+                         start_id: str = "0-0", count: int = None) -> tuple:
+        """Claim entries pending longer than min_idle_ms; returns the next start id and the entries"""
+        response = await self.redis_client.xautoclaim(key, group, consumer, min_idle_ms,
+                                                      start_id=start_id, count=count)
+        return response[0], response[1]
+
+    async def xpending_deliveries(self, key: str, group: str, consumer: str,
+                                  min_id: str, max_id: str, count: int) -> dict:
+        """Map a consumer's pending entry ids in a range to how often each has been delivered"""
+        pending = await self.redis_client.xpending_range(key, group, min_id, max_id, count, consumername=consumer)
+        return {entry["message_id"]: entry["times_delivered"] for entry in pending}
+
+    async def xack(self, key: str, group: str, *ids: str):
+        """Acknowledge processed stream entries"""
+        await self.redis_client.xack(key, group, *ids)
+
+    async def xdel(self, key: str, *ids: str):
+        """Delete entries from a stream"""
+        await self.redis_client.xdel(key, *ids)
+
+    def register_script(self, script: str):
+        """Register a Lua script, run later via EVALSHA"""
+        return self.redis_client.register_script(script)
+
     async def close(self):
-        """Close Redis connection"""
+        """Close Redis connections"""
         await self.redis_client.close()
+        await pool.disconnect()
 
 
 # Global async cache instance
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, HttpUrl, Field
+from pydantic import BaseModel, ConfigDict, HttpUrl, Field
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -10,6 +10,8 @@ class URLCreate(BaseModel):
 
 
 class URLResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     short_url: str
     original_url: str
     custom_alias: Optional[str]
@@ -1,13 +1,15 @@
+import asyncio
+
 from fastapi import HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, select, or_
+from sqlalchemy import func, desc, select, or_, Result
 from starlette import status
 
-from app.database import get_db, db_dependency
+from app.database import db_dependency, engine
 from app.models.url_models import URL, Click
 from app.schemas.analytics_schema import AnalyticsResponse, ClickAnalytics
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict
 
 
@@ -15,12 +17,19 @@ class AnalyticsService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
+    @staticmethod
+    async def _execute_concurrently(stmt) -> Result:
+        """Execute a read-only statement on a dedicated pooled connection"""
+        async with engine.connect() as conn:
+            return await conn.execute(stmt)
+
     async def get_url_analytics(self, short_code: str) -> AnalyticsResponse:
         """Get comprehensive analytics for a short URL asynchronously"""
-        # Get URL from database
-        stmt = select(URL).where(URL.short_code == short_code)
-        result = await self.db.execute(stmt)
-        db_url = result.scalar_one_or_none()
+        # Every query here runs on a short-lived connection of its own and never through the session,
+        # so the request doesn't hold a connection while the aggregates below wait for theirs
+        stmt = select(URL.id, URL.clicks).where(URL.short_code == short_code)
+        result = await self._execute_concurrently(stmt)
+        db_url = result.one_or_none()
 
         if not db_url:
             raise HTTPException(
@@ -32,24 +41,20 @@ class AnalyticsService:
         total_clicks = db_url.clicks
 
         # Clicks in last 24 hours
-        yesterday = datetime.utcnow() - timedelta(days=1)
+        yesterday = datetime.now(timezone.utc) - timedelta(days=1)
         stmt_24h = select(func.count(Click.id)).where(
             Click.url_id == db_url.id,
             Click.timestamp >= yesterday
         )
-        result_24h = await self.db.execute(stmt_24h)
-        clicks_last_24h = result_24h.scalar_one() or 0
 
         # Clicks by country
         stmt_country = select(Click.country, func.count(Click.id)).where(
             Click.url_id == db_url.id,
             Click.country.isnot(None)
         ).group_by(Click.country)
-        result_country = await self.db.execute(stmt_country)
-        clicks_by_country = dict(result_country.all())
 
         # Clicks by date (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+        thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
         stmt_date = select(
             func.date(Click.timestamp).label('date'),
             func.count(Click.id).label('count')
@@ -57,15 +62,24 @@ class AnalyticsService:
             Click.url_id == db_url.id,
             Click.timestamp >= thirty_days_ago
         ).group_by(func.date(Click.timestamp))
-        result_date = await self.db.execute(stmt_date)
-        clicks_by_date = {str(row.date): row.count for row in result_date.all()}
 
         # Recent clicks (last 50)
         stmt_recent = select(Click).where(
             Click.url_id == db_url.id
         ).order_by(desc(Click.timestamp)).limit(50)
-        result_recent = await self.db.execute(stmt_recent)
-        recent_clicks_query = result_recent.scalars().all()
+
+        # The session couldn't run these concurrently anyway, so each aggregate gets its own connection
+        result_24h, result_country, result_date, result_recent = await asyncio.gather(
+            self._execute_concurrently(stmt_24h),
+            self._execute_concurrently(stmt_country),
+            self._execute_concurrently(stmt_date),
+            self._execute_concurrently(stmt_recent)
+        )
+
+        clicks_last_24h = result_24h.scalar_one() or 0
+        clicks_by_country = dict(result_country.all())
+        clicks_by_date = {str(row.date): row.count for row in result_date.all()}
+        recent_clicks_query = result_recent.all()
 
         recent_clicks = [
             ClickAnalytics(
@@ -87,18 +101,13 @@ class AnalyticsService:
 
     async def get_all_urls_analytics(self) -> List[Dict]:
         """Get analytics for all URLs asynchronously"""
-        stmt = select(URL)
+        stmt = select(URL, func.count(Click.id)).outerjoin(
+            Click, Click.url_id == URL.id
+        ).group_by(URL.id)
         result = await self.db.execute(stmt)
-        urls = result.scalars().all()
-
-        analytics = []
-        for url in urls:
-            # Get recent click count for each URL
-            stmt_clicks = select(func.count(Click.id)).where(Click.url_id == url.id)
-            result_clicks = await self.db.execute(stmt_clicks)
-            total_clicks_from_table = result_clicks.scalar_one() or 0
 
-            analytics.append({
+        analytics = [
+            {
                 'short_code': url.short_code,
                 'original_url': url.original_url,
                 'total_clicks': url.clicks,  # From URL table
@@ -107,36 +116,30 @@ class AnalyticsService:
                 'expires_at': url.expires_at,
                 'is_active': url.is_active,
                 'custom_alias': url.custom_alias
-            })
+            } for url, total_clicks_from_table in result.all()
+        ]
 
         return analytics
 
     async def get_dashboard_stats(self) -> Dict:
         """Get overall dashboard statistics asynchronously"""
-        # Total URLs
-        stmt_total_urls = select(func.count(URL.id))
-        result_total_urls = await self.db.execute(stmt_total_urls)
-        total_urls = result_total_urls.scalar_one()
-
-        # Active URLs
-        stmt_active_urls = select(func.count(URL.id)).where(URL.is_active == True)
-        result_active_urls = await self.db.execute(stmt_active_urls)
-        active_urls = result_active_urls.scalar_one()
-
-        # Total clicks across all URLs
-        stmt_total_clicks = select(func.sum(URL.clicks))
-        result_total_clicks = await self.db.execute(stmt_total_clicks)
-        total_clicks = result_total_clicks.scalar_one() or 0
-
-        # Clicks in last 24 hours
-        yesterday = datetime.utcnow() - timedelta(dours=24)
-        stmt_clicks_24h = select(func.count(Click.id)).where(Click.timestamp >= yesterday)
-        result_clicks_24h = await self.db.execute(stmt_clicks_24h)
-        clicks_24h = result_clicks_24h.scalar_one() or 0
+        # URL totals and 24h clicks in one round-trip
+        yesterday = datetime.now(timezone.utc) - timedelta(hours=24)
+        url_totals = select(
+            func.count(URL.id).label('total_urls'),
+            func.count(URL.id).filter(URL.is_active == True).label('active_urls'),
+            func.coalesce(func.sum(URL.clicks), 0).label('total_clicks')
+        ).cte('url_totals')
+        recent_clicks = select(
+            func.count(Click.id).label('clicks_last_24h')
+        ).where(Click.timestamp >= yesterday).cte('recent_clicks')
+
+        result_totals = await self.db.execute(select(url_totals, recent_clicks))
+        totals = result_totals.one()
 
         # Most popular URLs (top 10)
         stmt_popular = select(URL).order_by(desc(URL.clicks)).limit(10)
-        result_popular = await db.execute(stmt_popular)
+        result_popular = await self.db.execute(stmt_popular)
         popular_urls = result_popular.scalars().all()
 
         popular_urls_data = [
@@ -150,10 +153,10 @@ class AnalyticsService:
         ]
 
         return {
-            'total_urls': total_urls,
-            'active_urls': active_urls,
-            'total_clicks': total_clicks,
-            'clicks_last_24h': clicks_24h,
+            'total_urls': totals.total_urls,
+            'active_urls': totals.active_urls,
+            'total_clicks': totals.total_clicks,
+            'clicks_last_24h': totals.clicks_last_24h,
             'popular_urls': popular_urls_data
         }
 
@@ -170,7 +173,7 @@ class AnalyticsService:
                 detail="URL not found"
             )
 
-        start_date = datetime.utcnow() - timedelta(days=days)
+        start_date = datetime.now(timezone.utc) - timedelta(days=days)
 
         stmt_timeline = select(
             func.date(Click.timestamp).label('date'),
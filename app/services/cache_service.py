@@ -1,5 +1,5 @@
 from app.redis_cache import cache
-import json
+import orjson
 from typing import Optional
 
 
@@ -21,22 +21,17 @@ class CacheService:
     async def cache_url(self, short_code: str, url_data: dict):
         """Cache URL data"""
         cache_key = self.generate_url_key(short_code)
-        cache.set_key(cache_key, json.dumps(url_data), expire=self.CACHE_TTL)
+        await cache.set_key(cache_key, orjson.dumps(url_data), expire=self.CACHE_TTL)
 
     async def get_cached_url(self, short_code: str) -> Optional[dict]:
         """Get cached URL data"""
         cache_key = self.generate_url_key(short_code)
         cached = await cache.get_key(cache_key)
         if cached:
-            return json.loads(cached)
+            return orjson.loads(cached)
         return None
 
     async def delete_cached_url(self, short_code: str):
         """Delete cached URL"""
         cache_key = self.generate_url_key(short_code)
-        return await cache.delete_key(cache_key)
-
-    async def increment_click_count(self, short_code: str) -> int:
-        """Increment click count in cache"""
-        cache_key = self.generate_analytics_key(short_code)
-        return await cache.increment_key(cache_key)
\ No newline at end of file
+        return await cache.delete_key(cache_key)
\ No newline at end of file
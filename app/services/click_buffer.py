@@ -0,0 +1,129 @@
+import asyncio
+import os
+import socket
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import case, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import AsyncSessionLocal
+from app.models.url_models import URL, Click
+from app.redis_cache import cache
+
+
+class ClickBuffer:
+    STREAM_KEY = "clicks:stream"
+    GROUP = "click-writers"
+    DEAD_LETTER_KEY = "clicks:dead-letter"
+    BATCH_SIZE = 1000
+    BLOCK_MS = 1000
+    # Unacknowledged for this long means the reader failed or exited. Kept well above the worst-case
+    # flush (a 30s pool_timeout plus the queries) so live batches are rarely taken over; flush is
+    # idempotent for when one is anyway.
+    CLAIM_IDLE_MS = 120_000
+    MAX_DELIVERIES = 5  # Entries failing this often are moved to the dead-letter stream
+
+    def __init__(self):
+        # One consumer per process so several workers can share the stream. The name changes on
+        # restart, so entries left pending by earlier processes are taken over with XAUTOCLAIM.
+        self.consumer = f"{socket.gethostname()}:{os.getpid()}"
+        self.claim_cursor = "0-0"
+
+    async def track(self, url_id: int, ip: str, user_agent: str = None):
+        """Queue a click to be written by the background flusher"""
+        await cache.xadd(self.STREAM_KEY, {
+            "url_id": url_id,
+            "ip": ip,
+            "ua": user_agent or "",
+            "ts": time.time()
+        })
+
+    async def run(self):
+        """Drain buffered clicks into the database until cancelled"""
+        group_ready = False
+        while True:
+            try:
+                if not group_ready:
+                    await cache.xgroup_create(self.STREAM_KEY, self.GROUP)
+                    group_ready = True
+
+                # Retry entries whose earlier flush failed before reading new ones
+                entries = await self.claim_stale()
+                if not entries:
+                    entries = await cache.xreadgroup(self.GROUP, self.consumer, self.STREAM_KEY,
+                                                     count=self.BATCH_SIZE, block=self.BLOCK_MS)
+                if entries:
+                    await self.flush(entries)
+            except Exception as e:
+                # The batch stays pending and is reclaimed once CLAIM_IDLE_MS has passed
+                print(f"Click flush failed, retrying: {e}")
+                await asyncio.sleep(1)
+
+    async def claim_stale(self) -> list:
+        """Take over idle pending entries from any consumer, dead-lettering ones that keep failing"""
+        self.claim_cursor, entries = await cache.xautoclaim(self.STREAM_KEY, self.GROUP, self.consumer,
+                                                            self.CLAIM_IDLE_MS, self.claim_cursor,
+                                                            count=self.BATCH_SIZE)
+        if not entries:
+            return []
+
+        deliveries = await cache.xpending_deliveries(self.STREAM_KEY, self.GROUP, self.consumer,
+                                                     entries[0][0], entries[-1][0],
+                                                     len(entries) + self.BATCH_SIZE)
+        dead = [(entry_id, fields) for entry_id, fields in entries
+                if deliveries.get(entry_id, 0) > self.MAX_DELIVERIES]
+        if dead:
+            for entry_id, fields in dead:
+                await cache.xadd(self.DEAD_LETTER_KEY, {**fields, "source_id": entry_id})
+            dead_ids = [entry_id for entry_id, _ in dead]
+            await cache.xack(self.STREAM_KEY, self.GROUP, *dead_ids)
+            await cache.xdel(self.STREAM_KEY, *dead_ids)
+            print(f"Moved {len(dead)} clicks to {self.DEAD_LETTER_KEY} after repeated flush failures")
+
+        return [entry for entry in entries if deliveries.get(entry[0], 0) <= self.MAX_DELIVERIES]
+
+    async def flush(self, entries: list):
+        """Write a batch of stream entries to the database and drop them from the stream"""
+        clicks = [
+            {
+                "url_id": int(fields["url_id"]),
+                "ip_address": fields["ip"],
+                "user_agent": fields["ua"] or None,
+                "timestamp": datetime.fromtimestamp(float(fields["ts"]), timezone.utc),
+                "stream_id": entry_id
+            } for entry_id, fields in entries
+        ]
+
+        async with AsyncSessionLocal.begin() as session:
+            # Drop clicks for URLs deleted while they were buffered
+            result = await session.execute(select(URL.id).where(URL.id.in_({click["url_id"] for click in clicks})))
+            existing_ids = set(result.scalars().all())
+            clicks = [click for click in clicks if click["url_id"] in existing_ids]
+
+            if clicks:
+                # A batch can be replayed after a failure or a reclaim; entries already written are
+                # skipped, and only the rows actually inserted count towards urls.clicks
+                result = await session.execute(
+                    insert(Click.__table__).values(clicks)
+                    .on_conflict_do_nothing(index_elements=["stream_id"])
+                    .returning(Click.__table__.c.url_id)
+                )
+                deltas = Counter(result.scalars().all())
+
+                if deltas:
+                    # Bump every counter in one statement
+                    await session.execute(
+                        update(URL).where(URL.id.in_(list(deltas)))
+                        .values(clicks=URL.clicks + case(deltas, value=URL.id))
+                        .execution_options(synchronize_session=False)
+                    )
+
+        entry_ids = [entry_id for entry_id, _ in entries]
+        await cache.xack(self.STREAM_KEY, self.GROUP, *entry_ids)
+        await cache.xdel(self.STREAM_KEY, *entry_ids)
+
+
+# Global click buffer instance
+click_buffer = ClickBuffer()
@@ -2,40 +2,50 @@ from app.redis_cache import cache
 from fastapi import HTTPException, status
 import time
 
+# Trim the window, count and record the request in one atomic round-trip.
+# Returns the request count including this one; over the limit the request isn't recorded.
+RATE_LIMIT_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+local count = redis.call('ZCARD', key)
+if count >= limit then
+    return count + 1
+end
+redis.call('ZADD', key, now, ARGV[4])
+redis.call('EXPIRE', key, window)
+return count + 1
+"""
+
 
 class RateLimiter:
     def __init__(self, requests: int = 100, window: int = 3600):  # 100 requests per hour
         self.requests = requests
         self.window = window
+        self.script = cache.register_script(RATE_LIMIT_SCRIPT)
 
     async def check_rate_limit(self, ip: str, endpoint: str):
         """Check if request is within rate limits"""
         key = f"rate_limit:{ip}:{endpoint}"
         current = int(time.time())
-        window_start = current - self.window
 
         try:
-            # Remove old requests - NO CONTEXT MANAGER
-            await cache.zremrangebyscore(key, 0, window_start)
-
-            # Count requests in current window - NO CONTEXT MANAGER
-            request_count = await cache.zcard(key)
-
-            if request_count >= self.requests:
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail="Rate limit exceeded"
-                )
-
-            # Add current request - NO CONTEXT MANAGER
-            await cache.zadd(key, {str(current): current})
-            await cache.expire(key, self.window)
-
+            # Unique member so requests within the same second are all counted
+            request_count = await self.script(keys=[key], args=[current, self.window, self.requests, time.time_ns()])
         except Exception as e:
             # If Redis is not available, log but don't block requests
             print(f"Rate limiting disabled due to Redis error: {e}")
             # Continue without rate limiting
+            return
+
+        if request_count > self.requests:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded"
+            )
 
 
 # Global rate limiter instance
-rate_limiter = RateLimiter()
\ No newline at end of file
+rate_limiter = RateLimiter()
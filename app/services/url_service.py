@@ -1,18 +1,31 @@
-from sqlalchemy import or_, select
+from collections import deque
+
+from sqlalchemy import bindparam, func, or_, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db, db_dependency
-from app.models.url_models import URL, Click
+from app.database import db_dependency
+from app.models.url_models import URL, url_id_seq
 from app.schemas.url_schemas import URLCreate, URLUpdate
 from app.services.cache_service import CacheService
+from app.services.click_buffer import click_buffer
 from app.services.rate_limiter import rate_limiter
 from fastapi import HTTPException, status, Depends
-import validators
-from datetime import datetime, timezone
+import time
+from typing import Tuple
+
+# Built once so every lookup by short code reuses the same statement and compiled SQL
+_SELECT_URL_BY_CODE = select(URL).where(URL.short_code == bindparam('short_code'))
+
+# Ids reserved from urls_id_seq in blocks, so most creations need only the INSERT round-trip
+_RESERVE_IDS_STMT = select(url_id_seq.next_value()).select_from(func.generate_series(1, 50))
+_reserved_url_ids = deque()
 
 
 class URLService:
+    SHORT_CODE_ATTEMPTS = 5
+
     def __init__(self, db: AsyncSession):
         self.cache_service = CacheService()
         self.db = db
@@ -23,13 +36,6 @@ class URLService:
         # Rate limiting for URL creation
         await rate_limiter.check_rate_limit(ip, "create_url")
 
-        # Validate URL
-        if not validators.url(str(url_data.original_url)):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid URL provided"
-            )
-
         # Check if custom alias is available
         if url_data.custom_alias:
             stmt = select(URL).where(
@@ -45,49 +51,63 @@ class URLService:
                 )
 
         # Create URL record
-        db_url = URL(
+        new_url = URL(
             original_url=str(url_data.original_url),
             custom_alias=url_data.custom_alias
         )
 
-        # Generate short code
-        if url_data.custom_alias:
-            db_url.short_code = url_data.custom_alias
-        else:
-            # Generate unique short code
-            while True:
-                short_code = db_url.generate_short_code()
-                existing = await self.db.execute(select(URL).where(URL.short_code == short_code))
-                if not existing:
-                    db_url.short_code = short_code
-                    break
-
         # Set expiration
-        db_url.set_expiration(url_data.expiration_days)
+        new_url.set_expiration(url_data.expiration_days)
+
+        # Generated codes are derived from a fresh id, so only a clash with an existing custom alias
+        # can make the insert a no-op; in that case retry with the next id
+        db_url = None
+        for _ in range(self.SHORT_CODE_ATTEMPTS):
+            values = {
+                'original_url': new_url.original_url,
+                'custom_alias': new_url.custom_alias,
+                'expires_at': new_url.expires_at
+            }
+            if url_data.custom_alias:
+                values['short_code'] = url_data.custom_alias
+            else:
+                values['id'] = await self._next_url_id()
+                values['short_code'] = URL.generate_short_code(values['id'])
 
-        self.db.add(db_url)
-        await self.db.flush()
+            stmt = insert(URL).values(**values).on_conflict_do_nothing(
+                index_elements=['short_code']
+            ).returning(URL)
+            result = await self.db.execute(stmt)
+            db_url = result.scalar_one_or_none()
+            if db_url or url_data.custom_alias:
+                break
+
+        if not db_url:
+            if url_data.custom_alias:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Custom alias already exists"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Could not generate a unique short code"
+            )
+
+        # Commit before touching the cache so it never holds a row that may still roll back
+        await self.db.commit()
 
         # Cache the URL
-        await self.cache_service.cache_url(db_url.short_code, {
-            'original_url': db_url.original_url,
-            'is_active': db_url.is_active,
-            'expires_at': db_url.expires_at.isoformat() if db_url.expires_at else None
-        })
+        await self.cache_service.cache_url(db_url.short_code, self._cache_payload(db_url))
 
         return db_url
 
-    async def get_original_url(self, short_code: str, ip: str, user_agent: str = None) -> str:
-        """Get original URL and track click"""
+    async def get_original_url(self, short_code: str, ip: str, user_agent: str = None) -> Tuple[str, int]:
+        """Get original URL and its expiry epoch (0 if none), and track click"""
         # Try cache first
         cached_url = await self.cache_service.get_cached_url(short_code)
-        if cached_url:
-            original_url = cached_url['original_url']
-            is_active = cached_url['is_active']
-            expires_at = cached_url.get('expires_at')
-        else:
+        if not cached_url:
             # Get from database
-            result = await self.db.execute(select(URL).where(URL.short_code == short_code))
+            result = await self.db.execute(_SELECT_URL_BY_CODE, {'short_code': short_code})
             db_url = result.scalar_one_or_none()
             if not db_url:
                 raise HTTPException(
@@ -95,69 +115,55 @@ class URLService:
                     detail="URL not found"
                 )
 
-            original_url = db_url.original_url
-            is_active = db_url.is_active
-            expires_at = db_url.expires_at
-
             # Cache the result
-            await self.cache_service.cache_url(short_code, {
-                'original_url': original_url,
-                'is_active': is_active,
-                'expires_at': expires_at.isoformat() if expires_at else None
-            })
+            cached_url = self._cache_payload(db_url)
+            await self.cache_service.cache_url(short_code, cached_url)
 
         # Check if URL is active and not expired
-        if not is_active:
+        if not cached_url['active']:
             raise HTTPException(
                 status_code=status.HTTP_410_GONE,
                 detail="URL has been deactivated"
             )
 
-        if expires_at:
-            if isinstance(expires_at, str):
-                expires_dt = datetime.fromisoformat(expires_at)
-            else:
-                expires_dt = expires_at
-
-            current_time = datetime.now(timezone.utc)
-
-            if expires_dt.tzinfo is None:
-                expires_dt = expires_dt.replace(tzinfo=timezone.utc)
-
-            if expires_dt < current_time:
-                raise HTTPException(
-                    status_code=status.HTTP_410_GONE,
-                    detail="URL has expired"
-                )
+        expires_ts = cached_url['expires_ts']
+        if expires_ts and expires_ts < time.time():
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="URL has expired"
+            )
 
         # Track click
-        await self._track_click(short_code, ip, user_agent)
-
-        return original_url
+        await self._track_click(cached_url['id'], ip, user_agent)
+
+        return cached_url['original_url'], expires_ts
+
+    async def _next_url_id(self) -> int:
+        """Take the next reserved URL id, reserving a new block when none are left"""
+        if not _reserved_url_ids:
+            # Concurrent refills only reserve a few extra ids, so no lock is needed
+            result = await self.db.execute(_RESERVE_IDS_STMT)
+            _reserved_url_ids.extend(result.scalars().all())
+        return _reserved_url_ids.popleft()
+
+    @staticmethod
+    def _cache_payload(db_url: URL) -> dict:
+        """Redirect data as cached in Redis, with expiry as an epoch so hits need no date parsing"""
+        return {
+            'id': db_url.id,
+            'original_url': db_url.original_url,
+            'expires_ts': int(db_url.expires_at.timestamp()) if db_url.expires_at else 0,
+            'active': 1 if db_url.is_active else 0
+        }
 
-    async def _track_click(self,short_code: str, ip: str, user_agent: str = None):
+    async def _track_click(self, url_id: int, ip: str, user_agent: str = None):
         """Track URL click"""
-        result = await self.db.execute(select(URL).where(URL.short_code == short_code))
-        db_url = result.scalar_one_or_none()
-        if db_url:
-            # Update click count
-            db_url.clicks += 1
-
-            # Create click record
-            click = Click(
-                url_id=db_url.id,
-                ip_address=ip,
-                user_agent=user_agent
-                # Could add geolocation service here
-            )
-            self.db.add(click)
-
-            # Update cache count
-            await self.cache_service.increment_click_count(short_code)
+        # Buffered in Redis and written to the database in batches by the click flusher
+        await click_buffer.track(url_id, ip, user_agent)
 
     async def update_url(self,short_code: str, update_data: URLUpdate) -> URL:
         """Update URL properties"""
-        result = await self.db.execute(select(URL).where(URL.short_code == short_code))
+        result = await self.db.execute(_SELECT_URL_BY_CODE, {'short_code': short_code})
         db_url = result.scalar_one_or_none() if result else None
         if not db_url:
             raise HTTPException(
@@ -167,7 +173,7 @@ class URLService:
 
         if update_data.custom_alias:
             # Check if new alias is available
-            result = await db.execute(select(URL).where(
+            result = await self.db.execute(select(URL).where(
                 URL.custom_alias == update_data.custom_alias,
                 URL.id != db_url.id
             ))
@@ -185,14 +191,15 @@ class URLService:
         if update_data.expiration_days:
             db_url.set_expiration(update_data.expiration_days)
 
-        # Clear cache
+        # Clear cache only once committed, or a concurrent redirect could re-cache the old row
+        await self.db.commit()
         await self.cache_service.delete_cached_url(short_code)
 
         return db_url
 
     async def delete_url(self, short_code: str):
         """Delete a short URL"""
-        result = await self.db.execute(select(URL).where(URL.short_code == short_code))
+        result = await self.db.execute(_SELECT_URL_BY_CODE, {'short_code': short_code})
         db_url = result.scalar_one_or_none() if result else None
         if not db_url:
             raise HTTPException(
@@ -201,6 +208,9 @@ class URLService:
             )
 
         await self.db.delete(db_url)
+
+        # Clear cache only once committed, or a concurrent redirect could re-cache the deleted row
+        await self.db.commit()
         await self.cache_service.delete_cached_url(short_code)
 
 